@@ -0,0 +1,160 @@
+"""作业分析系统的核心处理函数：花名册解析、内容指纹与提交归类"""
+import streamlit as st
+import pandas as pd
+import re
+import io
+import os
+import hashlib
+import xlsxwriter
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# 优先使用 calamine（Rust 实现，解析速度更快），未安装时回退到 openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# 内容指纹优先使用 BLAKE3（SIMD 加速），未安装时回退到 MD5
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# 9位学号的正则，模块级预编译后复用
+_SID_RE = re.compile(r'\d{9}')
+# 带捕获组的版本，供 Series.str.extract 整列提取
+_SID_GROUP_RE = re.compile(f'({_SID_RE.pattern})')
+
+def extract_id(filename):
+    """从文件名提取9位学号"""
+    match = _SID_RE.search(filename)
+    return match.group() if match else None
+
+def _fingerprint(file_obj, chunk_size=1 << 20):
+    """分块读取文件流计算内容指纹（仅用于判断内容是否完全一致，不涉及安全用途）"""
+    # 单线程哈希：并行已由 fingerprint_uploads 的线程池在文件层面完成
+    if blake3 is not None:
+        hasher = blake3.blake3()
+    else:
+        hasher = hashlib.md5()
+    file_obj.seek(0)
+    while chunk := file_obj.read(chunk_size):
+        hasher.update(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest()
+
+def _find_sid_column(df):
+    """定位学号列：优先匹配表头“学号”，否则取前5行中含9位数字的第一列"""
+    header_hits = df.columns.astype(str).str.contains('学号')
+    if header_hits.any():
+        return int(header_hits.argmax())
+    if df.empty:
+        return None
+    value_hits = df.head(5).astype(str).apply(
+        lambda col: col.str.contains(_SID_RE, na=False).any()
+    )
+    return int(value_hits.to_numpy().argmax()) if value_hits.any() else None
+
+@st.cache_data(show_spinner=False, max_entries=8, ttl="1h")
+def _parse_roster(file_bytes):
+    """解析花名册文件内容（按文件内容缓存，页面交互时不再重复解析）"""
+    try:
+        # 全部按字符串读取，跳过 pandas 的类型推断
+        df = pd.read_excel(io.BytesIO(file_bytes), engine=EXCEL_ENGINE, dtype=str)
+        # 寻找学号列索引
+        sid_idx = _find_sid_column(df)
+        if sid_idx is None: return None, "Excel中未找到学号列"
+        
+        # 姓名列为学号后一列
+        name_idx = sid_idx + 1
+        sid_col = df.iloc[:, sid_idx].astype(str)
+        if name_idx < len(df.columns):
+            # 空白姓名统一记为“未知”（dtype=str 下空单元格为 NaN）
+            name_col = df.iloc[:, name_idx].fillna("未知").astype(str)
+        else:
+            name_col = pd.Series("未知", index=df.index)
+        # 整列一次性提取学号，代替逐行 iterrows
+        sids = sid_col.str.extract(_SID_GROUP_RE, expand=False)
+        mask = sids.notna()
+        roster = dict(zip(sids[mask].tolist(), name_col[mask].tolist()))
+        return roster, None
+    except Exception as e:
+        return None, str(e)
+
+def get_roster_from_upload(uploaded_file):
+    """从上传的Excel中自动识别学号和姓名列"""
+    return _parse_roster(uploaded_file.getvalue())
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def _cached_fingerprint(file_id, name, size, _uploaded_file):
+    """单个上传文件的内容指纹，按 (file_id, 文件名, 大小) 缓存，增删其他文件时仍可复用"""
+    return _fingerprint(_uploaded_file)
+
+def fingerprint_uploads(uploaded_files):
+    """计算一批上传文件的内容指纹
+
+    大小唯一的文件不可能与其他文件内容一致，直接给出唯一占位指纹而不做哈希。
+    """
+    size_counts = Counter(f.size for f in uploaded_files)
+    to_hash = [f for f in uploaded_files if size_counts[f.size] >= 2]
+    # 哈希计算会释放 GIL，多文件时用线程池并行计算
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4)) as ex:
+        hashed = dict(zip(
+            (f.file_id for f in to_hash),
+            ex.map(lambda f: _cached_fingerprint(f.file_id, f.name, f.size, f), to_hash),
+        ))
+    return tuple(
+        hashed.get(f.file_id, f"uniq:{f.size}:{f.name}") for f in uploaded_files
+    )
+
+@st.cache_data(show_spinner=False, max_entries=8, ttl="1h")
+def build_analysis(roster_key, _roster_ids, file_records):
+    """按 (文件名, 大小, MD5) 记录归类提交情况，花名册与文件指纹不变时直接复用结果
+
+    缓存只按 roster_key（花名册上传的 file_id）区分花名册，_roster_ids 不参与哈希。
+    """
+    files = {"sid": [], "name": [], "size": [], "md5": []}
+    analysis = {
+        "files": files,  # 全部文件信息，按列存储；无法匹配名册的文件 sid 为 None
+        "valid": defaultdict(list),    # 合规提交 {学号: [文件下标]}
+        "unknown": [],  # 无法匹配的文件下标
+        "similarity": defaultdict(list) # MD5: [文件下标]
+    }
+
+    for i, (name, size, md5_hash) in enumerate(file_records):
+        sid = extract_id(name)
+        
+        # 移除了 is_late 判断逻辑
+        if not sid or sid not in _roster_ids:
+            sid = None
+            analysis["unknown"].append(i)
+        else:
+            analysis["valid"][sid].append(i)
+        files["sid"].append(sid)
+        files["name"].append(name)
+        files["size"].append(size)
+        files["md5"].append(md5_hash)
+        
+        # 记录相似度
+        analysis["similarity"][md5_hash].append(i)
+
+    # 转回普通 dict，避免渲染时误查询不存在的键而插入空列表
+    analysis["valid"] = dict(analysis["valid"])
+    analysis["similarity"] = dict(analysis["similarity"])
+    return analysis
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_missing_excel(df_missing):
+    """生成未交名单 Excel 文件内容（名单不变时复用，切换页签不再重新生成）"""
+    output = io.BytesIO()
+    # constant_memory 模式下每写新行就刷出前面的行，因此必须按行顺序写入；
+    # DataFrame.to_excel 是按列写的，会丢数据，这里直接用 xlsxwriter 逐行写
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, df_missing.columns.tolist())
+    for i, row in enumerate(df_missing.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(i, 0, row)
+    workbook.close()
+    return output.getvalue()
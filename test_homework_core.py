@@ -0,0 +1,127 @@
+import io
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("xlsxwriter")
+
+from streamlit.proto.Common_pb2 import FileURLs as FileURLsProto
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+
+import homework_core
+from homework_core import EXCEL_ENGINE, _parse_roster, build_missing_excel, fingerprint_uploads
+
+
+def _upload(file_id, name, data):
+    return UploadedFile(UploadedFileRec(file_id, name, "application/octet-stream", data), FileURLsProto())
+
+
+@pytest.fixture
+def hashed_names(monkeypatch):
+    """清空指纹缓存，并记录真正被哈希的文件名"""
+    homework_core._cached_fingerprint.clear()
+    names = []
+    real_fingerprint = homework_core._fingerprint
+
+    def recording_fingerprint(file_obj, *args, **kwargs):
+        names.append(file_obj.name)
+        return real_fingerprint(file_obj, *args, **kwargs)
+
+    monkeypatch.setattr(homework_core, "_fingerprint", recording_fingerprint)
+    yield names
+    homework_core._cached_fingerprint.clear()
+
+
+def test_fingerprint_uploads_groups_identical_files(hashed_names):
+    files = [_upload("1", "a.py", b"print(1)"), _upload("2", "b.py", b"print(1)"), _upload("3", "c.py", b"print(2)")]
+    digests = fingerprint_uploads(files)
+    assert digests[0] == digests[1]
+    assert digests[2] != digests[0]
+    assert sorted(hashed_names) == ["a.py", "b.py", "c.py"]
+
+
+def test_fingerprint_uploads_skips_unique_size(hashed_names):
+    files = [_upload("1", "a.py", b"abc"), _upload("2", "b.py", b"abc"), _upload("3", "c.py", b"longer")]
+    digests = fingerprint_uploads(files)
+    assert digests[2] == "uniq:6:c.py"
+    assert "c.py" not in hashed_names
+    assert len(set(digests)) == 2
+
+
+def test_fingerprint_uploads_hashes_once_size_collides(hashed_names):
+    solo = _upload("1", "a.py", b"abcdef")
+    assert fingerprint_uploads([solo]) == ("uniq:6:a.py",)
+    assert hashed_names == []
+
+    digests = fingerprint_uploads([solo, _upload("2", "b.py", b"uvwxyz")])
+    assert not any(d.startswith("uniq:") for d in digests)
+    assert digests[0] != digests[1]
+    assert sorted(hashed_names) == ["a.py", "b.py"]
+
+    # 已算过的文件按 file_id 复用缓存，只哈希新加入的文件
+    fingerprint_uploads([solo, _upload("2", "b.py", b"uvwxyz"), _upload("3", "c.py", b"abcdef")])
+    assert sorted(hashed_names) == ["a.py", "b.py", "c.py"]
+
+
+def test_fingerprint_uploads_keeps_upload_order(hashed_names):
+    files = [_upload(str(i), f"{i}.py", bytes([i]) * 4) for i in range(20)]
+    digests = fingerprint_uploads(files)
+    expected = tuple(homework_core._fingerprint(_upload("x", f.name, f.getvalue())) for f in files)
+    assert digests == expected
+
+
+def test_build_missing_excel_round_trip():
+    """导出的未交名单读回后应与原表完全一致（学号与姓名都不能丢）"""
+    df_missing = pd.DataFrame({
+        "学号": ["202301001", "202301002", "202301003"],
+        "姓名": ["张三", "李四", "王五"],
+    })
+    exported = pd.read_excel(io.BytesIO(build_missing_excel(df_missing)),
+                             engine=EXCEL_ENGINE, dtype=str)
+    pd.testing.assert_frame_equal(exported, df_missing)
+
+
+def _xlsx(df):
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False, engine="xlsxwriter")
+    return buf.getvalue()
+
+
+def test_parse_roster_finds_sid_column_by_header():
+    roster, err = _parse_roster(_xlsx(pd.DataFrame({
+        "序号": [1, 2],
+        "学号": [202301001, 202301002],  # 以数字形式存储
+        "姓名": ["张三", "李四"],
+    })))
+    assert err is None
+    assert roster == {"202301001": "张三", "202301002": "李四"}
+
+
+def test_parse_roster_finds_sid_column_by_values():
+    roster, err = _parse_roster(_xlsx(pd.DataFrame({
+        "编号": ["A", "B"],
+        "信息": ["学生202301001", "ID:202301002 转专业"],  # 学号嵌在文本中
+        "名字": ["张三", "李四"],
+    })))
+    assert err is None
+    assert roster == {"202301001": "张三", "202301002": "李四"}
+
+
+def test_parse_roster_without_name_column():
+    roster, err = _parse_roster(_xlsx(pd.DataFrame({"学号": ["202301001", "202301002"]})))
+    assert err is None
+    assert roster == {"202301001": "未知", "202301002": "未知"}
+
+
+def test_parse_roster_blank_name_is_unknown():
+    roster, err = _parse_roster(_xlsx(pd.DataFrame({
+        "学号": ["202301001", "202301002"],
+        "姓名": ["张三", None],
+    })))
+    assert err is None
+    assert roster == {"202301001": "张三", "202301002": "未知"}
+
+
+def test_parse_roster_without_sid_column():
+    assert _parse_roster(_xlsx(pd.DataFrame({"姓名": ["张三"], "班级": ["一班"]}))) == (None, "Excel中未找到学号列")